@@ -10,7 +10,7 @@
 
 
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 import urllib.parse
 
 from resolve_api.core.config import settings
@@ -32,8 +32,19 @@ DATABASE_URI = build_postgres_uri()
 
 engine = create_engine(
     DATABASE_URI,
+    pool_size=5,
+    max_overflow=10,
+    pool_recycle=1800,
     pool_pre_ping=True,
     future=True,
+    # Batch multi-row INSERTs into single "INSERT ... VALUES (...), (...)"
+    # statements instead of one round-trip per row (bulk_save_objects path).
+    insertmanyvalues_page_size=10000,
 )
 
-Session = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
+# scoped_session: short-lived helpers (logging, status updates) reuse one
+# thread-local session/connection instead of re-acquiring a pool connection
+# and re-running BEGIN/COMMIT setup per call.
+Session = scoped_session(
+    sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
+)
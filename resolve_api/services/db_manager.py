@@ -1,4 +1,4 @@
-from resolve_api.utils.utils import handle_large_values
+from resolve_api.utils.utils import parse_gap_series
 from resolve_api.utils.helpers import log_scenario
 from resolve_api.core.db_config import Session
 from resolve_api.schemas.models import (
@@ -9,6 +9,9 @@ from resolve_api.schemas.models import (
 )
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
+import time
+
+from sqlalchemy import delete, insert, select, update
 
 def create_entry(
     scenario_id: int,
@@ -17,39 +20,91 @@ def create_entry(
     object_instance_id: int,
     object_type_property_id: int,
     date_time,
-    value: str,
+    value: Optional[str],
     tag: Optional[str] = None,
     description: Optional[str] = None,
-):
-    return MainClass(
-        scenario_id=scenario_id,
-        component_id=component_id,
-        object_type_id=object_type_id,
-        object_instance_id=object_instance_id,
-        object_type_property_id=object_type_property_id,
-        date=date_time,
-        value=str(value) if value is not None else None,
-        tag=tag,
-        description=description,
-    )
-
-
-def get_mappings(session):
+) -> Dict:
+    # Plain dict for an executemany INSERT; `value` is already its final
+    # string form (see _parse_series), so no str() re-conversion here.
+    return {
+        "scenario_id": scenario_id,
+        "component_id": component_id,
+        "object_type_id": object_type_id,
+        "object_instance_id": object_instance_id,
+        "object_type_property_id": object_type_property_id,
+        "date": date_time,
+        "value": value,
+        "tag": tag,
+        "description": description,
+    }
+
+
+# Process-wide mapping cache: the instance/property dictionaries are static
+# reference data, so rebuilding them from the DB on every timestep is wasted
+# I/O. Reloaded after a TTL so renames eventually propagate.
+_MAPPINGS_TTL_S = 300.0
+_mappings_cache: Optional[Tuple[float, Tuple[Dict, Dict]]] = None
+
+
+def get_mappings(session, refresh: bool = False):
+    global _mappings_cache
+    now = time.monotonic()
+    if not refresh and _mappings_cache is not None and (now - _mappings_cache[0]) < _MAPPINGS_TTL_S:
+        return _mappings_cache[1]
+
+    # Column-only queries return lightweight Row tuples instead of full ORM
+    # instances (no __dict__/_sa_instance_state per row).
     instance_mapping = {
-        i.object_instance_name: (i.object_instance_id, i.object_type_id) for i in session.query(ObjectInstance).all()
+        name: (iid, otid)
+        for name, iid, otid in session.query(
+            ObjectInstance.object_instance_name,
+            ObjectInstance.object_instance_id,
+            ObjectInstance.object_type_id,
+        )
     }
     property_mapping = {
-        p.object_type_property_name: p.object_type_property_id for p in session.query(ObjectTypeProperty).all()
+        name: pid
+        for name, pid in session.query(
+            ObjectTypeProperty.object_type_property_name,
+            ObjectTypeProperty.object_type_property_id,
+        )
     }
+    _mappings_cache = (now, (instance_mapping, property_mapping))
     return instance_mapping, property_mapping
 
 
+def resolve_missing_instances(session, instance_mapping: Dict, names: List[str]) -> None:
+    """Resolve names absent from the cached mapping with one scoped IN query.
+
+    Covers instances created after the cache snapshot without reloading the
+    whole catalog; only the handful of missing rows travel over the wire.
+    """
+    missing = [n for n in names if n not in instance_mapping]
+    if not missing:
+        return
+    rows = session.execute(
+        select(
+            ObjectInstance.object_instance_name,
+            ObjectInstance.object_instance_id,
+            ObjectInstance.object_type_id,
+        ).where(ObjectInstance.object_instance_name.in_(missing))
+    ).all()
+    for name, iid, otid in rows:
+        instance_mapping[name] = (iid, otid)
+
+
 def delete_results_from_db(scenario_id: int):
     """Delete previous results for the given scenario."""
     session = Session()
     try:
         sc_id = int(scenario_id)
-        num_deleted = session.query(MainClass).filter(MainClass.scenario_id == sc_id).delete()
+        # Core DELETE: one statement, no SELECT-before-DELETE / identity-map sync
+        result = session.execute(
+            delete(MainClass)
+            .where(MainClass.scenario_id == sc_id)
+            .execution_options(synchronize_session=False)
+        )
+        num_deleted = result.rowcount
         session.commit()
         log_scenario(sc_id, f"{num_deleted} entries deleted from the database")
     except Exception:
@@ -71,8 +126,9 @@ def _split_pipeline(s: str) -> List[str]:
     return parts
 
 def _parse_series(series_str: str) -> List[str]:
-    # применяем вашу нормализацию (3.4e+35 и пр.)
-    return [handle_large_values(x) for x in _split_pipeline(series_str)]
+    # применяем вашу нормализацию (3.4e+35 и пр.); возвращаем финальную
+    # строковую форму — дальше значения уже не конвертируются
+    return [str(v) for v in parse_gap_series(series_str)]
 
 def save_gap_results(
         scenario_id: int,
@@ -116,6 +172,7 @@ def save_gap_results(
 
         # списки скважин и их "юнитов" (сепараторов)
         well_list = _split_pipeline(wells)
+        resolve_missing_instances(session, instance_mapping, well_list)
         separator_list = _split_pipeline(separators)
         if len(separator_list) < len(well_list):
             # подстрахуемся, чтобы zip не потерял хвосты
@@ -201,7 +258,7 @@ def save_gap_results(
                         object_instance_id=object_instance_id,
                         object_type_property_id=prop_id,
                         date_time=dt,
-                        value=str(value),
+                        value=value,
                         tag=unit_label,
                         description='',
                     )
@@ -211,7 +268,7 @@ def save_gap_results(
             log_scenario(sc_id, "[GAP] Nothing to save: empty entries set")
             return
 
-        session.bulk_save_objects(entries)
+        session.execute(insert(MainClass), entries)
         session.commit()
         log_scenario(sc_id, f"[GAP] Saved {len(entries)} entries to database")
 
@@ -223,18 +280,45 @@ def save_gap_results(
         session.close()
 
 
+# Last status written per scenario: duplicate callbacks/retries arrive with
+# the same value, so skip the UPDATE round-trip entirely when nothing changed.
+_LAST_STATUS: Dict[int, str] = {}
+
+
 def update_scenario_status(scenario_id: int, status: str) -> None:
     """Update ScenarioClass.status to the provided value (e.g., timestep)."""
+    sc_id = int(scenario_id)
+    if _LAST_STATUS.get(sc_id) == status:
+        return
     session = Session()
     try:
-        sc_id = int(scenario_id)
-        scenario = session.query(ScenarioClass).filter(ScenarioClass.scenario_id == sc_id).first()
-        if not scenario:
-            log_scenario(sc_id, "Scenario not found to update status")
-            return
-        scenario.status = status
+        # NULL-safe filter lets the DB drop no-ops from other workers too
+        # (status is nullable, so plain != would skip rows with no status yet)
+        result = session.execute(
+            update(ScenarioClass)
+            .where(
+                ScenarioClass.scenario_id == sc_id,
+                ScenarioClass.status.is_distinct_from(status),
+            )
+            .values(status=status)
+            .execution_options(synchronize_session=False)
+        )
         session.commit()
-        log_scenario(sc_id, "Scenario status updated")
+        if result.rowcount:
+            _LAST_STATUS[sc_id] = status
+            log_scenario(sc_id, "Scenario status updated")
+        else:
+            exists = session.execute(
+                select(ScenarioClass.scenario_id).where(
+                    ScenarioClass.scenario_id == sc_id
+                )
+            ).first()
+            if exists:
+                # Row already carries this status: remember it so the
+                # in-process cache can keep skipping the round-trip.
+                _LAST_STATUS[sc_id] = status
+            else:
+                log_scenario(sc_id, "Scenario not found")
     except Exception:
         session.rollback()
         log_scenario(scenario_id, "Error while updating scenario status")
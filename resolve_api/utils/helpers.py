@@ -1,30 +1,112 @@
 """Helper utilities for DB-backed scenario logging and small helpers."""
 
+import atexit
+import queue
+import threading
+import time
 from datetime import datetime, timezone
+from functools import lru_cache
 
-from resolve_api.core.db_config import Session
+from resolve_api.core.db_config import engine
 from resolve_api.schemas.models import ScenarioLog as SA_ScenarioLog
 
+# Precompiled Core INSERT: log rows never need ORM identity-map or
+# unit-of-work bookkeeping, so the flusher writes through the engine.
+_LOG_INSERT = SA_ScenarioLog.__table__.insert()
+
+# Deletion table for str.translate: strips every non-digit ASCII char in C,
+# instead of a per-character Python loop.
+_NON_DIGITS = str.maketrans("", "", "".join(chr(c) for c in range(128) if not chr(c).isdigit()))
+
+
+@lru_cache(maxsize=1024)
+def normalize_scenario_id_to_int(scenario_id) -> int:
+    """Coerce scenario ids like 123, "123" or "SC123" to a plain int.
+
+    Scenario ids are low-cardinality per process, so after the first
+    timestep this is a dict lookup rather than a parse.
+    """
+    if isinstance(scenario_id, int):
+        return scenario_id
+    s = str(scenario_id)
+    try:
+        return int(s)
+    except ValueError:
+        return int(s.translate(_NON_DIGITS))
+
+
+# ---------------------------------------------------------------------------
+# Batched scenario logging
+#
+# log_scenario used to open a Session, INSERT one row, commit and close per
+# message — a synchronous DB round-trip on every call. Calls now enqueue a
+# plain dict; a single listener thread drains the queue and writes batches
+# with one bulk_insert_mappings/commit per flush.
+# ---------------------------------------------------------------------------
+
+_LOG_FLUSH_BATCH = 200
+_LOG_FLUSH_INTERVAL_S = 0.5
+
+_log_queue: queue.Queue = queue.Queue()
+_log_sentinel = object()
+
+
+def _flush_log_rows(rows: list) -> None:
+    if not rows:
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(_LOG_INSERT, rows)
+    except Exception:
+        pass
+
+
+def _log_listener() -> None:
+    while True:
+        item = _log_queue.get()
+        if item is _log_sentinel:
+            break
+        rows = [item]
+        stopping = False
+        deadline = time.monotonic() + _LOG_FLUSH_INTERVAL_S
+        while len(rows) < _LOG_FLUSH_BATCH:
+            remaining = deadline - time.monotonic()
+            try:
+                nxt = _log_queue.get(timeout=remaining) if remaining > 0 else _log_queue.get_nowait()
+            except queue.Empty:
+                break
+            if nxt is _log_sentinel:
+                stopping = True
+                break
+            rows.append(nxt)
+        _flush_log_rows(rows)
+        if stopping:
+            break
+
+
+_log_thread = threading.Thread(target=_log_listener, name="scenario-log-writer", daemon=True)
+_log_thread.start()
+
+
+@atexit.register
+def _stop_log_listener() -> None:
+    _log_queue.put(_log_sentinel)
+    _log_thread.join(timeout=5)
+
 
 def log_scenario(scenario_id: int, message: str, progress: int | None = 0, ts: datetime | None = None) -> None:
-    """Insert a log row into apiapp_scenariolog for the given scenario.
+    """Queue a log row for apiapp_scenariolog for the given scenario.
 
     - Extracts digits from `scenario_id` (e.g., "SC123" -> 123).
     - Writes `message` and optional `progress` and `timestamp`.
+
+    The insert happens asynchronously on the listener thread.
     """
-    session = Session()
-    try:
-        session.add(
-            SA_ScenarioLog(
-                scenario_id=int(scenario_id),
-                timestamp=ts or datetime.now(timezone.utc),
-                message=message,
-                progress=int(progress or 0),
-            )
-        )
-        session.commit()
-    except Exception:
-        session.rollback()
-        raise
-    finally:
-        session.close()
+    _log_queue.put_nowait(
+        {
+            "scenario_id": normalize_scenario_id_to_int(scenario_id),
+            "timestamp": ts or datetime.now(timezone.utc),
+            "message": message,
+            "progress": int(progress or 0),
+        }
+    )
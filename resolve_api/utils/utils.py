@@ -1,13 +1,67 @@
 "Utility functions for project"
 # src/utils/utils.py
 
+import numpy as np
+
+
 def handle_large_values(value):
+    # Fast path: already-numeric inputs skip the float() parse entirely
+    if isinstance(value, float):
+        return 0 if value > 1e+10 else value
+    if isinstance(value, int):
+        return 0 if value > 1e+10 else float(value)
     try:
         float_value = float(value)
         if float_value > 1e+10:
             return 0
         return float_value
-    except ValueError:
+    except (ValueError, TypeError):
         return 0
 
+
+def handle_large_values_batch(values):
+    """Vectorized handle_large_values over a sequence of raw strings.
+
+    Parses the whole batch in one numpy cast (falling back to per-element
+    parsing only when the batch contains junk) and zeroes out-of-range
+    values with a single mask instead of N Python calls.
+    """
+    if not values:
+        return []
+    try:
+        floats = np.asarray(values, dtype=np.float64)
+    except ValueError:
+        floats = np.fromiter(
+            (handle_large_values(v) for v in values), dtype=np.float64, count=len(values)
+        )
+    # Same mask as parse_gap_series' fast path: 'nan'/'inf' tokens must
+    # normalize to 0.0 regardless of which parser handled the series.
+    floats[~np.isfinite(floats) | (floats > 1e+10)] = 0.0
+    return floats.tolist()
+
+
+def parse_gap_series(series_str):
+    """Parse a pipe-delimited GAP series ('1.5|2|...|') into normalized floats.
+
+    np.fromstring does the tokenizing and float parsing in one C pass; a
+    single mask then zeroes non-finite and out-of-range values. Falls back
+    to handle_large_values_batch when the string contains non-numeric
+    tokens: numpy 2.x raises ValueError on unparseable input, older
+    versions only warn and return a short array (the size check).
+    """
+    if not series_str:
+        return []
+    s = series_str.rstrip("|")
+    if not s:
+        return []
+    expected = s.count("|") + 1
+    try:
+        floats = np.fromstring(s, sep="|")
+    except ValueError:
+        return handle_large_values_batch(s.split("|"))
+    if floats.size != expected:
+        return handle_large_values_batch(s.split("|"))
+    floats[~np.isfinite(floats) | (floats > 1e+10)] = 0.0
+    return floats.tolist()
+
  
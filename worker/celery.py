@@ -16,5 +16,17 @@ app.conf.task_queues = (
 # по умолчанию можно указать очередь
 app.conf.task_default_queue = "scenarios"
 
+# статическая маршрутизация: точное имя -> очередь, без router-логики на
+# каждый publish
+app.conf.task_routes = {
+    "worker.run_scenario": {"queue": "scenarios"},
+    "worker.run_workflow": {"queue": "workflows"},
+}
+
+# задачи долгие: не префетчим пачку на один процесс и не даём redis
+# перевыдавать невидимые задачи раньше часа
+app.conf.worker_prefetch_multiplier = 1
+app.conf.broker_transport_options = {"visibility_timeout": 3600}
+
 # автопоиск задач в пакете worker
 app.autodiscover_tasks(["worker"])
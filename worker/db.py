@@ -2,12 +2,20 @@ import os
 import django
 from django.conf import settings
 
+# Локальный флаг: повторные вызовы setup_django() не трогают даже
+# ленивый settings.configured.
+_DJANGO_READY = False
+
 
 def setup_django():
     """
     Настраиваем Django окружение для работы с моделями воркера.
     """
+    global _DJANGO_READY
+    if _DJANGO_READY:
+        return
     if settings.configured:
+        _DJANGO_READY = True
         return
 
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -22,12 +30,15 @@ def setup_django():
                 "PASSWORD": os.getenv("POSTGRES_PASSWORD", "1"),
                 "HOST": os.getenv("POSTGRES_HOST", "postgresql"),
                 "PORT": os.getenv("POSTGRES_PORT", "5432"),
+                # Держим соединение между задачами вместо реконнекта на
+                # каждый таск; health check отсекает протухшие сокеты.
+                "CONN_MAX_AGE": int(os.getenv("POSTGRES_CONN_MAX_AGE", "600")),
+                "CONN_HEALTH_CHECKS": True,
             },
         },
         INSTALLED_APPS=[
             "django.contrib.contenttypes",
             "django.contrib.auth",
-            "smart_selects",
             "worker",  # регистрируем свои модели
         ],
         TIME_ZONE="Asia/Almaty",
@@ -36,3 +47,4 @@ def setup_django():
         MEDIA_ROOT=media_root,
     )
     django.setup()
+    _DJANGO_READY = True
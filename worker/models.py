@@ -1,11 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from functools import lru_cache
 import os
-from smart_selects.db_fields import ChainedForeignKey
 
 # --- New Unit System Models ---
 
@@ -215,6 +215,11 @@ class ScenarioLog(models.Model):
         db_table = 'apiapp_scenariolog'
         verbose_name = "ScenarioLog"
         verbose_name_plural = "ScenarioLogs"
+        # Логи читаются по сценарию в порядке времени; составной индекс
+        # избавляет от seq scan + sort.
+        indexes = [
+            models.Index(fields=["scenario", "-timestamp"], name="idx_scenlog_scn_ts"),
+        ]
 
 # ---------- Scenario ↔ Component Link ----------
 class ScenarioComponentLink(models.Model):
@@ -231,10 +236,15 @@ class ScenarioComponentLink(models.Model):
         return f"{self.scenario} ↔ {self.component} ({self.component.data_source})"
 
     def clean(self):
-        # Проверка: есть ли уже другой компонент с этим data_source в этом сценарии
+        # Проверка: есть ли уже другой компонент с этим data_source в этом сценарии.
+        # data_source берём подзапросом по component_id, чтобы не вытягивать
+        # сам component отдельным SELECT'ом.
+        ds_subquery = DataSourceComponent.objects.filter(
+            pk=self.component_id
+        ).values("data_source_id")
         exists = ScenarioComponentLink.objects.filter(
-            scenario=self.scenario,
-            component__data_source=self.component.data_source
+            scenario_id=self.scenario_id,
+            component__data_source_id__in=ds_subquery,
         ).exclude(pk=self.pk).exists()
 
         if exists:
@@ -247,6 +257,29 @@ class ScenarioComponentLink(models.Model):
         self.full_clean()  # запускаем clean() при сохранении
         super().save(*args, **kwargs)
 
+    @classmethod
+    def bulk_link(cls, scenario, components, batch_size=1000):
+        """Привязать компоненты одним bulk_create, минуя save()/full_clean().
+
+        Уникальность по data_source проверяется одним запросом + set в
+        Python; точные дубли добивает unique_together через
+        ignore_conflicts. Возвращает созданные связи.
+        """
+        existing_ds = set(
+            cls.objects.filter(scenario=scenario)
+            .values_list("component__data_source_id", flat=True)
+        )
+        links = []
+        for comp in components:
+            ds_id = comp.data_source_id
+            if ds_id in existing_ds:
+                continue
+            existing_ds.add(ds_id)
+            links.append(cls(scenario=scenario, component=comp))
+        return cls.objects.bulk_create(
+            links, batch_size=batch_size, ignore_conflicts=True
+        )
+
 
 # ---------- Object Models ----------
 class ObjectType(models.Model):
@@ -278,6 +311,29 @@ class ObjectInstance(models.Model):
         ordering = ["object_instance_name"] # Changed to name for better ordering
 
 
+@lru_cache(maxsize=None)
+def _base_unit_id_for_category(unit_category_id: int) -> int | None:
+    """Базовая единица для категории; кэшируется на процесс (см. сигналы ниже)."""
+    unit_type_id = (
+        UnitCategory.objects.filter(pk=unit_category_id)
+        .values_list("unit_type_id", flat=True)
+        .first()
+    )
+    if unit_type_id is None:
+        return None
+    return (
+        UnitDefinition.objects.filter(unit_type_id=unit_type_id, is_base=True)
+        .values_list("pk", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=UnitDefinition)
+@receiver(post_delete, sender=UnitDefinition)
+def _invalidate_base_unit_cache(sender, **kwargs):
+    _base_unit_id_for_category.cache_clear()
+
+
 class ObjectTypeProperty(models.Model):
     object_type_property_id = models.AutoField(primary_key=True)
     object_type = models.ForeignKey(ObjectType, on_delete=models.CASCADE, verbose_name="Object Type")
@@ -289,13 +345,10 @@ class ObjectTypeProperty(models.Model):
     unit = models.ForeignKey(UnitDefinition, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Unit", editable=False)  # auto-set
 
     def save(self, *args, **kwargs):
-        if self.unit_category:
-            # find the base unit for this category
-            base_unit = UnitDefinition.objects.filter(
-                unit_type=self.unit_category.unit_type,
-                is_base=True
-            ).first()
-            self.unit = base_unit
+        if self.unit_category_id:
+            # base unit per category via the process-wide cache; FK ids only,
+            # so no unit_category row is fetched on the way
+            self.unit_id = _base_unit_id_for_category(self.unit_category_id)
         else:
             self.unit = None
         super().save(*args, **kwargs)
@@ -311,6 +364,23 @@ class ObjectTypeProperty(models.Model):
         ordering = ["object_type_property_name"]
 
 # ---------- Main Data ----------
+class MainClassRelatedManager(models.Manager):
+    """Менеджер с select_related для горячих FK (__str__/to_dict/sub_data_source).
+
+    Используйте MainClass.objects_related для циклов по записям, чтобы не
+    ловить N+1; bulk-пути продолжают работать через обычный objects.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().select_related(
+            "component__data_source",
+            "object_type",
+            "object_instance",
+            "object_type_property",
+            "scenario",
+        )
+
+
 class MainClass(models.Model):
     data_set_id = models.AutoField(primary_key=True, unique=True)
     # Optional link to a scenario run that produced this record
@@ -331,13 +401,11 @@ class MainClass(models.Model):
     )
     object_type = models.ForeignKey(ObjectType, on_delete=models.CASCADE, verbose_name="Object Type")
     object_instance = models.ForeignKey(ObjectInstance, on_delete=models.CASCADE, verbose_name="Object Instance")
-    object_type_property = ChainedForeignKey(
+    # Обычный FK: цепочечный виджет smart_selects нужен только админке
+    # основного приложения, а у воркера он добавлял реф­лексивные проверки
+    # на каждый save. Инвариант type/property держит pre_save-валидатор.
+    object_type_property = models.ForeignKey(
         ObjectTypeProperty,
-        chained_field="object_type",              # на какое поле смотрим
-        chained_model_field="object_type",        # с каким полем в ObjectTypeProperty связываем
-        show_all=False,
-        auto_choose=True,
-        sort=True,
         on_delete=models.CASCADE,
         verbose_name="Object Type Property"
     )
@@ -348,6 +416,9 @@ class MainClass(models.Model):
     tag = models.CharField("Tag", max_length=100, blank=True, null=True)
     description = models.TextField("Description", null=True, blank=True)
 
+    objects = models.Manager()
+    objects_related = MainClassRelatedManager()
+
     @property
     def sub_data_source(self) -> str | None:
         """Вычисляется из связанного ObjectTypeProperty.object_type_property_category"""
@@ -377,15 +448,47 @@ class MainClass(models.Model):
             models.Index(fields=["scenario"]),
             models.Index(fields=["component"]),
             models.Index(fields=["object_type", "object_type_property"]),
+            # Составные под горячие выборки: сценарий+компонент и
+            # временные ряды по инстансу/свойству.
+            models.Index(fields=["scenario", "component"], name="idx_main_scn_comp"),
+            models.Index(
+                fields=["scenario", "object_instance", "object_type_property", "date_time"],
+                name="idx_main_scn_inst_prop_ts",
+            ),
+            models.Index(fields=["component", "date_time"], name="idx_main_comp_ts"),
         ]
 
 
 # ---------- Validation ----------
+@lru_cache(maxsize=4096)
+def _object_instance_type_id(object_instance_id: int) -> int | None:
+    """object_type_id инстанса без загрузки всей строки; кэш на процесс."""
+    return (
+        ObjectInstance.objects.filter(pk=object_instance_id)
+        .values_list("object_type_id", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=ObjectInstance)
+@receiver(post_delete, sender=ObjectInstance)
+def _invalidate_instance_type_cache(sender, **kwargs):
+    _object_instance_type_id.cache_clear()
+
+
 @receiver(pre_save, sender=MainClass)
 def validate_object_instance(sender, instance, **kwargs):
-    if instance.object_instance.object_type != instance.object_type:
+    # Сравниваем FK id напрямую — без SELECT'а object_instance на каждый save
+    if _object_instance_type_id(instance.object_instance_id) != instance.object_type_id:
         raise ValidationError("Object instance must belong to the selected object type.")
  
+@lru_cache(maxsize=128)
+def _read_workflow_code(path: str, mtime_ns: int) -> str:
+    """Содержимое файла кода; mtime в ключе, так что правки сбрасывают кэш."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
 def workflow_code_path(instance, filename):
     return os.path.join("workflows", f"{instance.component.id}.py")
  
@@ -417,8 +520,8 @@ class Workflow(models.Model):
     def python_code(self):
         if self.code_file and self.code_file.path:
             try:
-                with open(self.code_file.path, "r", encoding="utf-8") as f:
-                    return f.read()
+                path = self.code_file.path
+                return _read_workflow_code(path, os.stat(path).st_mtime_ns)
             except FileNotFoundError:
                 return ""
         return ""
@@ -492,6 +595,12 @@ class WorkflowRun(models.Model):
         db_table = "apiapp_workflow_run"
         ordering = ["-started_at"]
         app_label = "apiapp"
+        # Под ordering и выборку runs конкретного workflow.
+        indexes = [
+            models.Index(fields=["-started_at"], name="idx_wfrun_started"),
+            models.Index(fields=["workflow", "-started_at"], name="idx_wfrun_wf_started"),
+            models.Index(fields=["task_id"], name="idx_wfrun_task_id"),
+        ]
  
     def __str__(self):
         return f"Workflow {self.workflow_id} run @ {self.started_at} -> {self.status}"
@@ -7,10 +7,13 @@ class PetexException(Exception):
     def __init__(self, message: str, code: Optional[int] = None):
         self.message = message
         self.code = code
-        super().__init__(self.__str__())
+        # Format once; __str__ is hit repeatedly by logging/repr on retry
+        # loops, so don't rebuild the same string per call.
+        self._formatted = message if code is None else f"[{code}] {message}"
+        super().__init__(self._formatted)
 
     def GetError(self) -> str:  # kept for backwards-compat parity
         return self.message
 
     def __str__(self) -> str:
-        return f"{self.message}" if self.code is None else f"[{self.code}] {self.message}"
\ No newline at end of file
+        return self._formatted
@@ -1,6 +1,8 @@
 import json
 from collections import defaultdict
 
+from .utils import split_gap_list
+
 # ===================== Core helpers =====================
 
 TWO_PORT_TYPES = ["PIPE", "INLCHK", "INLGEN"]
@@ -10,13 +12,15 @@ def get_uid_maps(srv, model="PROD"):
     Return two dicts:
       uid_type: {uid: TYPE}
       uid_label: {uid: Label}
+
+    Uses the OpenServer [$] list form, so the whole equipment set costs
+    three COM round-trips instead of three per item.
     """
-    n = int(srv.get_value(f"GAP.MOD[{model}].EQUIP.COUNT") or 0)
+    uids = split_gap_list(srv.get_value(f"GAP.MOD[{model}].EQUIP[$].UniqueID"))
+    types = split_gap_list(srv.get_value(f"GAP.MOD[{model}].EQUIP[$].Type"))
+    labels = split_gap_list(srv.get_value(f"GAP.MOD[{model}].EQUIP[$].Label"))
     uid_type, uid_label = {}, {}
-    for i in range(n):
-        uid = srv.get_value(f"GAP.MOD[{model}].EQUIP[{i}].UniqueID")
-        etype = srv.get_value(f"GAP.MOD[{model}].EQUIP[{i}].Type")
-        label = srv.get_value(f"GAP.MOD[{model}].EQUIP[{i}].Label")
+    for uid, etype, label in zip(uids, types, labels):
         if uid:
             uid_type[uid] = (etype.upper() if etype else "UNKNOWN")
             uid_label[uid] = label or uid
@@ -27,14 +31,15 @@ def get_all_edges_with_uids(srv, model="PROD", equip_types=TWO_PORT_TYPES):
     """
     Collect all 2-port equipments with EndA/EndB UIDs.
     Returns: {equip_uid: (enda_uid, endb_uid, type)}
+
+    Three batched [$] reads per equipment type instead of 3N indexed gets.
     """
     edges = {}
     for etype in equip_types:
-        count = int(srv.get_value(f"GAP.MOD[{model}].{etype}.COUNT") or 0)
-        for i in range(count):
-            uid   = srv.get_value(f"GAP.MOD[{model}].{etype}[{i}].UniqueID")
-            enda  = srv.get_value(f"GAP.MOD[{model}].{etype}[{i}].EndA.UniqueID")
-            endb  = srv.get_value(f"GAP.MOD[{model}].{etype}[{i}].EndB.UniqueID")
+        uids  = split_gap_list(srv.get_value(f"GAP.MOD[{model}].{etype}[$].UniqueID"))
+        endas = split_gap_list(srv.get_value(f"GAP.MOD[{model}].{etype}[$].EndA.UniqueID"))
+        endbs = split_gap_list(srv.get_value(f"GAP.MOD[{model}].{etype}[$].EndB.UniqueID"))
+        for uid, enda, endb in zip(uids, endas, endbs):
             if uid and enda and endb:
                 edges[uid] = (enda, endb, etype)
     return edges
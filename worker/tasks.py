@@ -28,10 +28,12 @@ from worker.helpers import (
     run_python_file,
     ensure_scenario_media_dir,
     log_scenario,
-    excel_serial_date,
-    convert_value_and_unit,
+    excel_serial_dates_bulk,
+    convert_rows,
+    convert_series_values,
     download_component_file_to,
-    normalize_ddmmyyyy
+    normalize_ddmmyyyy,
+    prepare_rows_for_conversion,
 )
 
 # =========================
@@ -65,7 +67,10 @@ def run_workflow(workflow_id: int, scheduler_id: int = None):
     """
     Run a workflow task, optionally linked to a WorkflowScheduler entry.
     """
-    wf = Workflow.objects.get(pk=workflow_id)
+    # The task only needs code_file/component; the JSON blobs (cells,
+    # configs) are read by the script subprocess itself, so skip shipping
+    # them here.
+    wf = Workflow.objects.defer("cells", "inputs_config", "outputs_config").get(pk=workflow_id)
     task_id = current_task.request.id
 
     def _tail(text: str | None, max_chars: int) -> str | None:
@@ -80,7 +85,7 @@ def run_workflow(workflow_id: int, scheduler_id: int = None):
         run = WorkflowRun.objects.get(task_id=task_id)
         run.status = "STARTED"
         run.started_at = timezone.now()
-        run.save()
+        run.save(update_fields=["status", "started_at"])
     except WorkflowRun.DoesNotExist:
         # fallback (manual run)
         run = WorkflowRun.objects.create(
@@ -96,7 +101,7 @@ def run_workflow(workflow_id: int, scheduler_id: int = None):
             run.status = "FAILURE"
             run.error = "No code file"
             run.finished_at = timezone.now()
-            run.save()
+            run.save(update_fields=["status", "error", "finished_at"])
             return {"status": "FAILURE", "msg": "No code file"}
 
         base_url = (os.getenv("WORKER_MAIN_SERVER_BASE_URL") or os.getenv("DJANGO_BASE_URL") or "http://host.docker.internal:8000").rstrip("/")
@@ -129,7 +134,7 @@ def run_workflow(workflow_id: int, scheduler_id: int = None):
         run.output = _tail(out, 50_000)
         run.error = _tail(err, 50_000) if rc != 0 else None
         run.status = "SUCCESS" if rc == 0 else "FAILURE"
-        run.save()
+        run.save(update_fields=["status", "output", "error", "finished_at"])
 
         return {"status": run.status}
 
@@ -137,7 +142,7 @@ def run_workflow(workflow_id: int, scheduler_id: int = None):
         run.status = "FAILURE"
         run.error = str(e)
         run.finished_at = timezone.now()
-        run.save()
+        run.save(update_fields=["status", "error", "finished_at"])
         return {"status": "FAILURE", "msg": str(e)}
 """
 Scenario utilities and tasks
@@ -179,11 +184,11 @@ def generate_events_csv_for_scenario(scenario_id: int) -> tuple[int | None, int
     model_copied_path: str | None = None
 
     # Query events data; if no event component, create empty file with header
+    # (convert_rows applies the select_related contract itself)
     qs = MainClass.objects.none()
     if event_component_id:
         qs = (
             MainClass.objects
-            .select_related("object_instance", "object_type", "object_type_property")
             .filter(component_id=event_component_id)
             .order_by("date_time")
         )
@@ -194,9 +199,14 @@ def generate_events_csv_for_scenario(scenario_id: int) -> tuple[int | None, int
     with csv_path.open("w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
         writer.writerow(EVENTS_CSV_HEADER)
-        for row in qs.iterator():
-            # Date as Excel serial
-            date_val = excel_serial_date(getattr(row, "date_time", None))
+        # Batched path: values/units convert in a few vectorized passes and
+        # dates collapse to one datetime64 subtraction, instead of a
+        # convert_value_and_unit + excel_serial_date call per row.
+        converted = list(convert_rows(qs, unit_map))
+        date_serials = excel_serial_dates_bulk(
+            [getattr(row, "date_time", None) for row, _, _, _ in converted]
+        ).tolist()
+        for (row, value, unit, category), date_val in zip(converted, date_serials):
             type_name = (
                 row.object_type.object_type_name if getattr(row, "object_type", None) else ""
             )
@@ -209,8 +219,6 @@ def generate_events_csv_for_scenario(scenario_id: int) -> tuple[int | None, int
                 if getattr(row, "object_type_property", None)
                 else ""
             )
-            # Convert value and unit to target unit system
-            value, unit, category = convert_value_and_unit(row, unit_map)
             description = (row.description or "").replace("\n", " ")
             writer.writerow([
                 date_val,
@@ -254,10 +262,8 @@ def generate_decline_curves_csvs_for_scenario(scenario_id: int) -> tuple[int | N
         # No Decline Curves component linked; nothing to generate
         return None, None, None
 
-    qs = (
-        MainClass.objects
-        .select_related("object_type", "object_instance", "object_type_property")
-        .filter(component_id=dc_component_id)
+    qs = prepare_rows_for_conversion(
+        MainClass.objects.filter(component_id=dc_component_id)
     )
     
     # Prepare unit conversion mapping for DECLINE CURVES (target only)
@@ -279,14 +285,6 @@ def generate_decline_curves_csvs_for_scenario(scenario_id: int) -> tuple[int | N
         props_by_type.setdefault(otype, set()).add(prop)
         series_map[key].setdefault(prop, (_split_series(row.value), row))
     
-    def _convert_value_with_row(raw: str, template_row: MainClass) -> str:
-        try:
-            template_row.value = raw
-            value, _unit, _category = convert_value_and_unit(template_row, unit_map_target, no_round=True)
-            return value
-        except Exception:
-            return raw
-
     def write_csv(target_type: str, out_path: Path) -> str | None:
         cols = sorted(props_by_type.get(target_type, []))
         if not cols:
@@ -298,23 +296,26 @@ def generate_decline_curves_csvs_for_scenario(scenario_id: int) -> tuple[int | N
             for (otype, name), prop_series in series_map.items():
                 if otype != target_type:
                     continue
+                # Convert each series once, vectorized, instead of a scalar
+                # conversion per emitted cell
+                converted = {
+                    p: (
+                        convert_series_values(vr[0], vr[1], unit_map_target, no_round=True)
+                        if isinstance(vr, tuple)
+                        else (vr or [])
+                    )
+                    for p, vr in prop_series.items()
+                }
                 # Determine max series length across selected properties
                 max_len = 0
                 for p in cols:
-                    vals_row = prop_series.get(p)
-                    vals = vals_row[0] if isinstance(vals_row, tuple) else (vals_row or [])
-                    max_len = max(max_len, len(vals))
+                    max_len = max(max_len, len(converted.get(p, [])))
                 # Emit rows 1..max_len
                 for i in range(max_len):
                     row_vals = [i + 1, name]
                     for p in cols:
-                        vals_row = prop_series.get(p)
-                        if isinstance(vals_row, tuple):
-                            vals, trow = vals_row
-                        else:
-                            vals, trow = (vals_row or []), None
-                        raw = vals[i] if i < len(vals) else ""
-                        row_vals.append(_convert_value_with_row(raw, trow) if trow else raw)
+                        vals = converted.get(p, [])
+                        row_vals.append(vals[i] if i < len(vals) else "")
                     writer.writerow(row_vals)
         return str(out_path)
 
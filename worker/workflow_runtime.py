@@ -388,10 +388,28 @@ def _resolve_property(val, obj_type):
     return None
 
 
+def _lookup_cache_key(val):
+    """Stable hashable key for the per-batch resolve caches."""
+    if isinstance(val, dict):
+        return tuple(sorted((k, str(v)) for k, v in val.items()))
+    if hasattr(val, "pk"):
+        return ("pk", val.pk)
+    return val
+
+
 def _save_records_to_db(records, mode="append"):
     items = records if isinstance(records, list) else [records]
     comp_id_env = os.getenv("WORKFLOW_COMPONENT_ID")
 
+    saved = []  # (MainClass obj, history time)
+
+    # Batches typically reference the same few types/instances/properties;
+    # resolve each unique key once instead of one .get() per record.
+    comp_cache: dict = {}
+    ot_cache: dict = {}
+    oi_cache: dict = {}
+    otp_cache: dict = {}
+
     for rec in items:
         if not isinstance(rec, dict):
             continue
@@ -399,11 +417,28 @@ def _save_records_to_db(records, mode="append"):
         comp_id = rec.get("component") or comp_id_env
         if not comp_id:
             raise RuntimeError("Missing component for record")
-        comp = DataSourceComponent.objects.get(pk=int(comp_id))
+        comp_id = int(comp_id)
+        comp = comp_cache.get(comp_id)
+        if comp is None:
+            comp = DataSourceComponent.objects.get(pk=comp_id)
+            comp_cache[comp_id] = comp
+
+        ot_key = _lookup_cache_key(rec.get("object_type"))
+        if ot_key not in ot_cache:
+            ot_cache[ot_key] = _resolve_obj(ObjectType, rec.get("object_type"), "object_type_name", "object_type_id")
+        obj_type = ot_cache[ot_key]
+
+        oi_key = _lookup_cache_key(rec.get("object_instance"))
+        if oi_key not in oi_cache:
+            oi_cache[oi_key] = _resolve_obj(
+                ObjectInstance, rec.get("object_instance"), "object_instance_name", "object_instance_id"
+            )
+        obj_inst = oi_cache[oi_key]
 
-        obj_type = _resolve_obj(ObjectType, rec.get("object_type"), "object_type_name", "object_type_id")
-        obj_inst = _resolve_obj(ObjectInstance, rec.get("object_instance"), "object_instance_name", "object_instance_id")
-        obj_prop = _resolve_property(rec.get("object_type_property"), obj_type)
+        otp_key = (_lookup_cache_key(rec.get("object_type_property")), obj_type.pk if obj_type else None)
+        if otp_key not in otp_cache:
+            otp_cache[otp_key] = _resolve_property(rec.get("object_type_property"), obj_type)
+        obj_prop = otp_cache[otp_key]
 
         if not obj_type or not obj_inst or not obj_prop:
             raise RuntimeError("Missing object_type/object_instance/object_type_property")
@@ -430,14 +465,36 @@ def _save_records_to_db(records, mode="append"):
         obj.date_time = dt_val
         obj.save()
 
-        history_time = obj.date_time or timezone.now()
-        existing = MainClassHistory.objects.filter(main_record=obj, time=history_time).order_by("-id").first()
-        if existing:
-            if existing.value != obj.value:
-                existing.value = obj.value
-                existing.save(update_fields=["value"])
-        else:
-            MainClassHistory.objects.create(main_record=obj, time=history_time, value=obj.value)
+        saved.append((obj, obj.date_time or timezone.now()))
+
+    # History bookkeeping in two queries instead of 2N: one prefetch of the
+    # (main_record, time) pairs being written, then bulk update/insert. Keyed
+    # by pair, not latest-per-record: one record carries history at many times.
+    if saved:
+        hist_by_pair = {}
+        for h in (
+            MainClassHistory.objects
+            .filter(
+                main_record_id__in={o.pk for o, _ in saved},
+                time__in={t for _, t in saved},
+            )
+            .order_by("id")
+        ):
+            hist_by_pair[(h.main_record_id, h.time)] = h
+        to_update = []
+        to_create = []
+        for obj, history_time in saved:
+            existing = hist_by_pair.get((obj.pk, history_time))
+            if existing is not None:
+                if existing.value != obj.value:
+                    existing.value = obj.value
+                    to_update.append(existing)
+            else:
+                to_create.append(MainClassHistory(main_record=obj, time=history_time, value=obj.value))
+        if to_update:
+            MainClassHistory.objects.bulk_update(to_update, ["value"])
+        if to_create:
+            MainClassHistory.objects.bulk_create(to_create, batch_size=500)
 
     return {"status": "saved_db", "count": len(items)}
 